@@ -3,12 +3,61 @@ import urllib.parse
 from datetime import datetime
 import re
 import logging
+import queue
+import threading
+import traceback
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+# Pin pyodbc's default connection pooling explicitly, the parallel scan relies on it
+db.pooling = True
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Control characters deleted via str.translate, lone surrogates via regex
+_DEL_TABLE = dict.fromkeys(list(range(0x20)) + [0x7F])
+_SURROGATE_RE = re.compile(r'[\ud800-\udfff]')
+
+# Default comparable data type families, used when the comparison table is unavailable
+_TYPE_FAMILIES = (
+    ('varchar', 'char', 'nvarchar', 'nchar', 'text', 'ntext'),
+    ('int', 'integer', 'smallint', 'bigint', 'tinyint'),
+    ('float', 'real', 'decimal', 'numeric', 'money', 'smallmoney'),
+    ('date', 'datetime', 'datetime2', 'smalldatetime'),
+)
+_TYPE_MAP = {t: family for family in _TYPE_FAMILIES for t in family}
+
+# Distinct matching reference values needed to flag a field as sensitive
+MATCH_THRESHOLD = 10000
+
+# Number of tracking rows buffered before they are written with executemany
+BATCH_SIZE = 500
+
+# Number of rows fetched per round trip when streaming large metadata result sets
+FETCH_SIZE = 1000
+
+# Number of databases scanned in parallel, each worker owns its own connection
+MAX_WORKERS = 8
+
+# Maximum length of a SQL Server identifier (sysname)
+_MAX_IDENTIFIER_LENGTH = 128
+
+
+def _quote_identifier(name):
+    """Bracket-quote a database object name the way QUOTENAME does"""
+    if not name or len(name) > _MAX_IDENTIFIER_LENGTH:
+        raise ValueError(f"Invalid SQL identifier: {name!r}")
+    return '[' + name.replace(']', ']]') + ']'
+
+
+# Row of the sensitive data reference table
+SensitiveRef = namedtuple('SensitiveRef', 'server_name database_name table_name field_name type_data status')
+
+# Column of a scanned table that is a candidate for a sensitive data reference
+FieldInfo = namedtuple('FieldInfo', 'database schema table column data_type')
+
 
 class SensitiveDataScanner:
     def __init__(self, connection_string=None, server=None, database=None, trusted_connection=None):
@@ -23,6 +72,24 @@ class SensitiveDataScanner:
         
         self.conn = None
         self.cursor = None
+        self._processed_table_exists = False
+        
+        # Comparable data types keyed by (database, lowercased type)
+        self._comparable_types_cache = {}
+        
+        # Tracking rows waiting to be written in batches
+        self._sensitive_buf = []
+        self._processed_buf = []
+        
+        # Per-thread worker scanners used by the parallel scan
+        self._local = threading.local()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        
+        # Number of tracking writes, database scans and match checks that failed during the current scan
+        self._failed_writes = 0
+        self._failed_scans = 0
+        self._failed_matches = 0
         
     def parse_connection_string(self, connection_string):
         """Parse a connection string in the format: 'mssql://server:port/database?params'"""
@@ -58,12 +125,17 @@ class SensitiveDataScanner:
         # Convert to string if it's not already
         if not isinstance(value, str):
             value = str(value)
+        
+        # Printable ASCII has no control or invalid Unicode characters to remove
+        if value.isascii() and value.isprintable():
+            return value
             
         # Remove NULL bytes and control characters
-        value = re.sub(r'[\x00-\x1F\x7F]', '', value)
+        value = value.translate(_DEL_TABLE)
         
-        # Remove invalid Unicode characters
-        value = ''.join(c for c in value if ord(c) < 0xD800 or 0xDFFF < ord(c))
+        # Remove invalid Unicode characters (never present in ASCII strings)
+        if not value.isascii():
+            value = _SURROGATE_RE.sub('', value)
         
         return value
             
@@ -76,8 +148,15 @@ class SensitiveDataScanner:
                 # In a real scenario, you would handle username/password here
                 connection_str = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={self.server};DATABASE={self.database};"
             
-            self.conn = db.connect(connection_str)
+            # autocommit=False is pyodbc's default, pinned here because tracking writes are committed in batches
+            self.conn = db.connect(connection_str, autocommit=False)
             self.cursor = self.conn.cursor()
+            self.cursor.fast_executemany = True
+            
+            # Check once whether the tracking table exists instead of probing it per schema
+            self.cursor.execute("SELECT 1 FROM sys.objects WHERE object_id = OBJECT_ID(N'processed_fields') AND type in (N'U')")
+            self._processed_table_exists = self.cursor.fetchone() is not None
+            
             logger.info(f"Successfully connected to SQL Server: {self.server}, Database: {self.database}")
             return True
         except Exception as e:
@@ -108,40 +187,20 @@ class SensitiveDataScanner:
             
             self.cursor.execute(query)
             
-            sensitive_data_references = []
-            for row in self.cursor.fetchall():
-                # Sanitize all string values to remove invalid characters
-                sensitive_data_references.append({
-                    'server_name': self.sanitize_string(row[0]),
-                    'database_name': self.sanitize_string(row[1]),
-                    'table_name': self.sanitize_string(row[2]),
-                    'field_name': self.sanitize_string(row[3]),
-                    'type_data': self.sanitize_string(row[4]),
-                    'status': self.sanitize_string(row[5])
-                })
-            
-            return sensitive_data_references
+            # Sanitize all string values to remove invalid characters
+            return [SensitiveRef(*map(self.sanitize_string, row)) for row in self.cursor.fetchall()]
         except Exception as e:
             logger.error(f"Error ketika mengambil nilai sensitive data references: {str(e)}")
             # Log the full traceback for debugging
-            import traceback
             logger.error(traceback.format_exc())
             return []
             
     def get_database_list(self):
         """Get list of databases excluding system databases"""
-        excluded_databases = [
-            ('your_db_want_to_exclude')
-        ]
-        
         try:
             self.cursor.execute("SELECT name FROM sys.databases WHERE name IN ('your_db')")
             
-            databases = []
-            for row in self.cursor.fetchall():
-                databases.append(self.sanitize_string(row[0]))
-            
-            return databases
+            return [self.sanitize_string(row[0]) for row in self.cursor.fetchall()]
         except Exception as e:
             logger.error(f"Error ketika mengambil nilai database list: {str(e)}")
             return []
@@ -149,11 +208,11 @@ class SensitiveDataScanner:
     def get_schemas_in_database(self, database):
         """Get list of schemas in a database"""
         try:
-            # Sanitize the database name to prevent SQL injection
+            # Sanitize and quote the database name to prevent SQL injection
             database = self.sanitize_string(database)
             
-            self.cursor.execute(f"USE [{database}]")
-            self.cursor.execute("SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA")
+            # Use 3-part naming instead of switching the connection's database
+            self.cursor.execute(f"SELECT SCHEMA_NAME FROM {_quote_identifier(database)}.INFORMATION_SCHEMA.SCHEMATA")
             
             schemas = []
             for row in self.cursor.fetchall():
@@ -167,36 +226,45 @@ class SensitiveDataScanner:
             return []
             
     def get_comparable_data_types(self, type_data):
-        """Get list of comparable data types for a given reference data type"""
+        """Get tuple of comparable data types for a given reference data type"""
+        type_data = self.sanitize_string(type_data) or ''
+        
+        # Only the cache key is lowercased, the lookup uses the value as stored
+        cache_key = (self.database, type_data.lower())
+        
+        if cache_key not in self._comparable_types_cache:
+            comparable_types = self._fetch_comparable_data_types(type_data)
+            if not comparable_types:
+                logger.warning(f"No comparable data types found for reference data type {type_data!r}")
+            self._comparable_types_cache[cache_key] = comparable_types
+        
+        return self._comparable_types_cache[cache_key]
+    
+    def _fetch_comparable_data_types(self, type_data):
+        """Query the lowercased comparable data types for a reference data type"""
         try:
-            # Sanitize the type_data to prevent SQL injection
-            type_data = self.sanitize_string(type_data)
-            
-            query = f"""
+            query = """
                 SELECT datatypecompare 
                 FROM [your_schema].[your_table]
-                WHERE datatype_ref = '{type_data}'
+                WHERE datatype_ref = ?
             """
             
-            self.cursor.execute(query)
+            self.cursor.execute(query, (type_data,))
             
-            return [self.sanitize_string(row[0]) for row in self.cursor.fetchall()]
+            # Skip NULL comparison types instead of failing the whole lookup
+            values = map(self.sanitize_string, (row[0] for row in self.cursor.fetchall()))
+            return tuple(value.lower() for value in values if value)
         except Exception as e:
             logger.error(f"Error retrieving comparable data types: {str(e)}")
             # Default mappings if table doesn't exist
-            if type_data.lower() in ['varchar', 'char', 'nvarchar', 'nchar', 'text', 'ntext']:
-                return ['varchar', 'char', 'nvarchar', 'nchar', 'text', 'ntext']
-            elif type_data.lower() in ['int', 'integer', 'smallint', 'bigint', 'tinyint']:
-                return ['int', 'integer', 'smallint', 'bigint', 'tinyint']
-            elif type_data.lower() in ['float', 'real', 'decimal', 'numeric', 'money', 'smallmoney']:
-                return ['float', 'real', 'decimal', 'numeric', 'money', 'smallmoney']
-            elif type_data.lower() in ['date', 'datetime', 'datetime2', 'smalldatetime']:
-                return ['date', 'datetime', 'datetime2', 'smalldatetime']
-            else:
-                return [type_data]
+            return _TYPE_MAP.get(type_data.lower(), (type_data.lower(),))
             
-    def get_fields_to_check(self, database, schema, ref_server, ref_db, ref_table, ref_field):
-        """Get list of fields to check in a specific schema"""
+    def get_fields_to_check(self, database, schema, ref_server, ref_db, ref_table, ref_field, comparable_types):
+        """Get list of fields with a comparable data type to check in a specific schema"""
+        # Nothing can match a reference without comparable types
+        if not comparable_types:
+            return []
+        
         try:
             # Sanitize all input parameters
             database = self.sanitize_string(database)
@@ -206,65 +274,54 @@ class SensitiveDataScanner:
             ref_table = self.sanitize_string(ref_table)
             ref_field = self.sanitize_string(ref_field)
             
-            # Use the specified database
-            self.cursor.execute(f"USE [{database}]")
-            
-            # Get list of tables in schema
+            quoted_database = _quote_identifier(database)
+            
+            # Load already processed (table, column) pairs for this reference in one query
+            processed = set()
+            if self._processed_table_exists:
+                self.cursor.execute("""
+                    SELECT table_name, column_name FROM processed_fields
+                    WHERE database_name = ?
+                    AND schema_name = ?
+                    AND ref_server = ?
+                    AND ref_db = ?
+                    AND ref_table = ?
+                    AND ref_field = ?
+                """, (database, schema, ref_server, ref_db, ref_table, ref_field))
+                processed = {(row[0], row[1]) for row in self.cursor.fetchall()}
+            
+            # Get comparable columns of every base table in the schema in one query
+            # Use 3-part naming instead of switching the connection's database
+            type_placeholders = ', '.join('?' * len(comparable_types))
             self.cursor.execute(f"""
-                SELECT TABLE_NAME
-                FROM INFORMATION_SCHEMA.TABLES
-                WHERE TABLE_SCHEMA = '{schema}'
-                AND TABLE_TYPE = 'BASE TABLE'
-            """)
-            tables = [self.sanitize_string(row[0]) for row in self.cursor.fetchall()]
-            
-            # Check if tracking table exists
-            processed_table_exists = False
-            try:
-                self.cursor.execute(f"SELECT TOP 1 1 FROM processed_fields")
-                processed_table_exists = True
-            except:
-                pass
-                
+                SELECT c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE
+                FROM {quoted_database}.INFORMATION_SCHEMA.COLUMNS c
+                INNER JOIN {quoted_database}.INFORMATION_SCHEMA.TABLES t
+                ON t.TABLE_SCHEMA = c.TABLE_SCHEMA
+                AND t.TABLE_NAME = c.TABLE_NAME
+                WHERE c.TABLE_SCHEMA = ?
+                AND t.TABLE_TYPE = 'BASE TABLE'
+                AND c.DATA_TYPE IN ({type_placeholders})
+                ORDER BY c.TABLE_NAME
+            """, (schema, *comparable_types))
+            
+            # Fetch the potentially large result set in chunks to reduce per-row fetch calls
             fields = []
-            for table in tables:
-                # Get column information for this table
-                self.cursor.execute(f"""
-                    SELECT COLUMN_NAME, DATA_TYPE
-                    FROM INFORMATION_SCHEMA.COLUMNS
-                    WHERE TABLE_SCHEMA = '{schema}'
-                    AND TABLE_NAME = '{table}'
-                """)
+            while True:
+                rows = self.cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
                 
-                for column_info in self.cursor.fetchall():
-                    column_name = self.sanitize_string(column_info[0])
-                    data_type = self.sanitize_string(column_info[1])
+                for column_info in rows:
+                    table = self.sanitize_string(column_info[0])
+                    column_name = self.sanitize_string(column_info[1])
+                    data_type = self.sanitize_string(column_info[2])
                     
                     # Skip if field has already been processed
-                    if processed_table_exists:
-                        check_query = f"""
-                            SELECT TOP 1 1 FROM processed_fields
-                            WHERE database_name = '{database}'
-                            AND schema_name = '{schema}'
-                            AND table_name = '{table}'
-                            AND column_name = '{column_name}'
-                            AND ref_server = '{ref_server}'
-                            AND ref_db = '{ref_db}'
-                            AND ref_table = '{ref_table}'
-                            AND ref_field = '{ref_field}'
-                        """
-                        
-                        self.cursor.execute(check_query)
-                        if self.cursor.fetchone():
-                            continue
+                    if (table, column_name) in processed:
+                        continue
                     
-                    fields.append({
-                        'database': database,
-                        'schema': schema,
-                        'table': table,
-                        'column': column_name,
-                        'data_type': data_type
-                    })
+                    fields.append(FieldInfo(database, schema, table, column_name, data_type))
             
             return fields
         except Exception as e:
@@ -272,34 +329,36 @@ class SensitiveDataScanner:
             return []
             
     def check_matching_records(self, field_info, ref_db, ref_table, ref_field):
-        """Check how many matching records exist between two fields"""
+        """Check how many matching records exist between two fields, capped at MATCH_THRESHOLD, or None on error"""
         try:
-            # Sanitize all input parameters
-            database = self.sanitize_string(field_info['database'])
-            schema = self.sanitize_string(field_info['schema'])
-            table = self.sanitize_string(field_info['table'])
-            column = self.sanitize_string(field_info['column'])
-            ref_db = self.sanitize_string(ref_db)
-            ref_table = self.sanitize_string(ref_table)
-            ref_field = self.sanitize_string(ref_field)
-            
-            # Use 4-part naming for cross-database queries in SQL Server
+            # Sanitize and quote all identifiers, they cannot be passed as parameters
+            database = _quote_identifier(self.sanitize_string(field_info.database))
+            schema = _quote_identifier(self.sanitize_string(field_info.schema))
+            table = _quote_identifier(self.sanitize_string(field_info.table))
+            column = _quote_identifier(self.sanitize_string(field_info.column))
+            ref_db = _quote_identifier(self.sanitize_string(ref_db))
+            ref_table = _quote_identifier(self.sanitize_string(ref_table))
+            ref_field = _quote_identifier(self.sanitize_string(ref_field))
+            
+            # Use 4-part naming for cross-database queries in SQL Server.
+            # DISTINCT TOP lets the server stop the join once the threshold is reached.
             query = f"""
-            SELECT TOP 100 COUNT(DISTINCT b.[{ref_field}])
-            FROM [{database}].[{schema}].[{table}] a
-            INNER JOIN [{ref_db}].[dbo].[{ref_table}] b 
-            ON a.[{column}] = b.[{ref_field}]
-            WHERE b.[{ref_field}] IS NOT NULL
-            AND LTRIM(RTRIM(CONVERT(VARCHAR(MAX), b.[{ref_field}]))) != ''
-            AND b.[{ref_field}] NOT IN ('N/A', '-')
+            SELECT COUNT(*) FROM (
+                SELECT DISTINCT TOP {MATCH_THRESHOLD} b.{ref_field}
+                FROM {database}.{schema}.{table} a
+                INNER JOIN {ref_db}.[dbo].{ref_table} b 
+                ON a.{column} = b.{ref_field}
+                WHERE b.{ref_field} IS NOT NULL
+                AND b.{ref_field} NOT IN ('N/A', '-')
+                AND LTRIM(RTRIM(CONVERT(VARCHAR(MAX), b.{ref_field}))) != ''
+            ) x
             """
             
             self.cursor.execute(query)
-            count = self.cursor.fetchone()[0]
-            return count
+            return self.cursor.fetchval()
         except Exception as e:
             logger.error(f"Error checking matching records: {str(e)}")
-            return 0
+            return None
             
     def ensure_tracking_tables_exist(self):
         """Create tracking tables if they don't exist"""
@@ -324,72 +383,271 @@ class SensitiveDataScanner:
             """
             self.cursor.execute(processed_table_query)
             
-                      
+            # Create table for tracking sensitive fields
+            sensitive_table_query = """
+            IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'sensitive_fields') AND type in (N'U'))
+            BEGIN
+                CREATE TABLE sensitive_fields (
+                    id BIGINT IDENTITY(1,1) PRIMARY KEY,
+                    database_name VARCHAR(255),
+                    schema_name VARCHAR(255),
+                    table_name VARCHAR(255),
+                    column_name VARCHAR(255),
+                    data_type VARCHAR(255),
+                    status VARCHAR(50),
+                    ref_server VARCHAR(255),
+                    ref_db VARCHAR(255),
+                    ref_table VARCHAR(255),
+                    ref_field VARCHAR(255),
+                    identified_date DATETIME
+                )
+            END
+            """
+            self.cursor.execute(sensitive_table_query)
+            self.conn.commit()
+            self._processed_table_exists = True
+            return True
+        except Exception as e:
+            logger.error(f"Error creating tracking tables: {str(e)}")
+            return False
+            
     def mark_as_sensitive(self, field_info, server_name, db_name, table_name, field_name):
-        """Mark a field as sensitive in the tracking table"""
+        """Queue a field to be marked as both sensitive and processed in the tracking tables"""
         try:
             # Sanitize all input parameters
-            database = self.sanitize_string(field_info['database'])
-            schema = self.sanitize_string(field_info['schema'])
-            table = self.sanitize_string(field_info['table'])
-            column = self.sanitize_string(field_info['column'])
-            data_type = self.sanitize_string(field_info['data_type'])
+            database = self.sanitize_string(field_info.database)
+            schema = self.sanitize_string(field_info.schema)
+            table = self.sanitize_string(field_info.table)
+            column = self.sanitize_string(field_info.column)
+            data_type = self.sanitize_string(field_info.data_type)
             server_name = self.sanitize_string(server_name)
             db_name = self.sanitize_string(db_name)
             table_name = self.sanitize_string(table_name)
             field_name = self.sanitize_string(field_name)
             
-            params = (
+            self._sensitive_buf.append((
                 database, schema, table, column,
                 data_type, 'Sensitive', server_name, db_name, table_name, field_name
-            )
+            ))
+            self._processed_buf.append((
+                database, schema, table, column,
+                server_name, db_name, table_name, field_name
+            ))
+            logger.info(f"Queued field as sensitive: {database}.{schema}.{table}.{column}")
             
-            self.cursor.execute(query, params)
-            self.conn.commit()
-            logger.info(f"Marked field as sensitive: {database}.{schema}.{table}.{column}")
+            if len(self._processed_buf) >= BATCH_SIZE:
+                return self._flush_tracking()
             return True
         except Exception as e:
             logger.error(f"Error marking field as sensitive: {str(e)}")
             return False
             
     def mark_as_processed(self, field_info, server_name, db_name, table_name, field_name):
-        """Mark a field as processed in the tracking table"""
+        """Queue a field to be marked as processed in the tracking table"""
         try:
             # Sanitize all input parameters
-            database = self.sanitize_string(field_info['database'])
-            schema = self.sanitize_string(field_info['schema'])
-            table = self.sanitize_string(field_info['table'])
-            column = self.sanitize_string(field_info['column'])
+            database = self.sanitize_string(field_info.database)
+            schema = self.sanitize_string(field_info.schema)
+            table = self.sanitize_string(field_info.table)
+            column = self.sanitize_string(field_info.column)
             server_name = self.sanitize_string(server_name)
             db_name = self.sanitize_string(db_name)
             table_name = self.sanitize_string(table_name)
             field_name = self.sanitize_string(field_name)
             
-            query = """
-                INSERT INTO [DQ_DEV].[dbo].[processed_fields] (
-                    database_name, schema_name, table_name, column_name, 
-                    ref_server, ref_db, ref_table, ref_field, process_date
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, GETDATE())
-            """
-            
-            params = (
+            self._processed_buf.append((
                 database, schema, table, column,
                 server_name, db_name, table_name, field_name
-            )
+            ))
             
-            self.cursor.execute(query, params)
-            self.conn.commit()
-            logger.info(f"Marked field as processed: {database}.{schema}.{table}.{column}")
+            if len(self._processed_buf) >= BATCH_SIZE:
+                return self._flush_tracking()
             return True
         except Exception as e:
             logger.error(f"Error marking field as processed: {str(e)}")
             return False
     
+    def _flush_tracking(self):
+        """Write all queued sensitive and processed fields in a single transaction"""
+        if not self._sensitive_buf and not self._processed_buf:
+            return True
+        
+        sensitive_query = """
+            INSERT INTO [DQ_DEV].[dbo].[sensitive_fields] (
+                database_name, schema_name, table_name, column_name,
+                data_type, status, ref_server, ref_db, ref_table, ref_field, identified_date
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, GETDATE())
+        """
+        processed_query = """
+            INSERT INTO [DQ_DEV].[dbo].[processed_fields] (
+                database_name, schema_name, table_name, column_name, 
+                ref_server, ref_db, ref_table, ref_field, process_date
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, GETDATE())
+        """
+        
+        try:
+            if self._sensitive_buf:
+                self.cursor.executemany(sensitive_query, self._sensitive_buf)
+            if self._processed_buf:
+                self.cursor.executemany(processed_query, self._processed_buf)
+            
+            # One commit keeps sensitive marks and their processed marks atomic
+            self.conn.commit()
+            logger.info(f"Wrote {len(self._sensitive_buf)} sensitive fields and {len(self._processed_buf)} processed fields")
+            written_sensitive = self._sensitive_buf
+            success = True
+        except Exception as e:
+            logger.error(f"Error writing tracking tables, retrying row by row: {str(e)}")
+            self._rollback()
+            
+            # Retry individually so one bad row does not discard the whole batch
+            failed_sensitive = self._write_rows_individually(sensitive_query, self._sensitive_buf)
+            
+            # Leave fields whose sensitive mark failed unprocessed so the next run retries them
+            failed_keys = {row[:4] + row[6:] for row in failed_sensitive}
+            processed_rows = [row for row in self._processed_buf if row not in failed_keys]
+            failed_processed = self._write_rows_individually(processed_query, processed_rows)
+            
+            written_sensitive = [row for row in self._sensitive_buf if row not in failed_sensitive]
+            success = not failed_sensitive and not failed_processed
+        
+        for row in written_sensitive:
+            logger.info(f"Marked field as sensitive: {row[0]}.{row[1]}.{row[2]}.{row[3]}")
+        
+        self._sensitive_buf.clear()
+        self._processed_buf.clear()
+        return success
+    
+    def _write_rows_individually(self, query, rows):
+        """Insert and commit rows one at a time, returning the rows that could not be written"""
+        failed = []
+        for row in rows:
+            try:
+                self.cursor.execute(query, row)
+                self.conn.commit()
+            except Exception as e:
+                logger.error(f"Error writing tracking row {row}: {str(e)}")
+                self._rollback()
+                failed.append(row)
+        
+        return failed
+    
+    def _rollback(self):
+        """Roll back the current transaction, logging instead of raising on failure"""
+        try:
+            self.conn.rollback()
+        except Exception as e:
+            logger.error(f"Error rolling back transaction: {str(e)}")
+    
+    def _worker_scanner(self):
+        """Get the scanner owning the current worker thread's connection, connecting on first use"""
+        worker = getattr(self._local, 'scanner', None)
+        if worker is None:
+            worker = SensitiveDataScanner(
+                server=self.server,
+                database=self.database,
+                trusted_connection=self.trusted_connection
+            )
+            if not worker.connect():
+                raise RuntimeError("Worker could not connect to SQL Server")
+            
+            self._local.scanner = worker
+            with self._workers_lock:
+                self._workers.append(worker)
+        
+        return worker
+    
+    def _close_workers(self):
+        """Close the connections opened by worker threads"""
+        with self._workers_lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers.clear()
+    
+    def _scan_database(self, ref, database, schemas, comparable_types, results):
+        """Scan one database for a reference on a worker connection, queueing outcomes for the writer"""
+        worker = self._worker_scanner()
+        logger.info(f"Processing reference {ref.database_name}.{ref.table_name}.{ref.field_name} in database: {database}")
+        
+        # Process each schema
+        for schema in schemas:
+            logger.info(f"Checking schema: {database}.{schema}")
+            
+            # Get fields with a comparable data type within the schema
+            fields = worker.get_fields_to_check(
+                database,
+                schema,
+                ref.server_name, 
+                ref.database_name, 
+                ref.table_name, 
+                ref.field_name,
+                comparable_types
+            )
+            logger.info(f"Found {len(fields)} fields to check in schema {database}.{schema}")
+            
+            # Check each field
+            for field in fields:
+                # Count matching records against the reference field
+                match_count = worker.check_matching_records(
+                    field,
+                    ref.database_name,
+                    ref.table_name,
+                    ref.field_name
+                )
+                
+                # On error queue a None outcome, the writer counts it and leaves the field for the next run
+                if match_count is None:
+                    results.put((field, ref, None))
+                    continue
+                
+                # If match count reaches threshold, the field is sensitive
+                results.put((field, ref, match_count >= MATCH_THRESHOLD))
+    
+    def _write_results(self, results):
+        """Record queued (field, ref, is_sensitive) outcomes until a None sentinel is received"""
+        while True:
+            item = results.get()
+            if item is None:
+                break
+            
+            field, ref, is_sensitive = item
+            
+            # The match check failed, count the field but leave it unrecorded
+            if is_sensitive is None:
+                self._failed_matches += 1
+                continue
+            
+            # Sensitive fields are marked as processed in the same batch
+            if is_sensitive:
+                written = self.mark_as_sensitive(
+                    field,
+                    ref.server_name,
+                    ref.database_name,
+                    ref.table_name,
+                    ref.field_name
+                )
+            else:
+                written = self.mark_as_processed(
+                    field,
+                    ref.server_name,
+                    ref.database_name,
+                    ref.table_name,
+                    ref.field_name
+                )
+            
+            if not written:
+                self._failed_writes += 1
+    
     def scan_for_sensitive_data(self):
         """Main method to scan for sensitive data across databases"""
         if not self.connect():
             return False
+        
+        self._failed_writes = 0
+        self._failed_scans = 0
+        self._failed_matches = 0
             
         try:
             # Make sure tracking tables exist
@@ -400,74 +658,57 @@ class SensitiveDataScanner:
             sensitive_data_refs = self.get_sensitive_data_references()
             logger.info(f"Found {len(sensitive_data_refs)} sensitive data references to check")
             
-            # Process each sensitive data reference
-            for ref in sensitive_data_refs:
-                logger.info(f"Processing reference: {ref['database_name']}.{ref['table_name']}.{ref['field_name']}")
-                
-                # Get list of databases to check
-                databases = self.get_database_list()
-                logger.info(f"Found {len(databases)} databases to check")
-                
-                # Process each database
-                for database in databases:
-                    logger.info(f"Checking database: {database}")
-                    
-                    # Get schemas within the database
-                    schemas = self.get_schemas_in_database(database)
-                    logger.info(f"Found {len(schemas)} schemas in database {database}")
-                    
-                    # Get comparable data types
-                    comparable_types = self.get_comparable_data_types(ref['type_data'])
-                    
-                    # Process each schema
-                    for schema in schemas:
-                        logger.info(f"Checking schema: {database}.{schema}")
-                        
-                        # Get fields to check within the schema
-                        fields = self.get_fields_to_check(
-                            database,
-                            schema,
-                            ref['server_name'], 
-                            ref['database_name'], 
-                            ref['table_name'], 
-                            ref['field_name']
-                        )
-                        logger.info(f"Found {len(fields)} fields to check in schema {database}.{schema}")
-                        
-                        # Check each field
-                        for field in fields:
-                            # Extract base data type for comparison
-                            base_type = field['data_type'].lower()
-                            
-                            # Skip if data types cannot be compared
-                            if not any(comp_type in base_type for comp_type in comparable_types):
-                                self.mark_as_processed(
-                                    field,
-                                    ref['server_name'],
-                                    ref['database_name'],
-                                    ref['table_name'],
-                                    ref['field_name']
-                                )
-                                continue
-                                                        
-                            # If match count exceeds threshold, mark as sensitive
-                            if match_count >= 10000:
-                                self.mark_as_sensitive(
-                                    field,
-                                    ref['server_name'],
-                                    ref['database_name'],
-                                    ref['table_name'],
-                                    ref['field_name']
-                                )
-                            
-                            # Mark as processed
-                            self.mark_as_processed(
-                                field,
-                                ref['server_name'],
-                                ref['database_name'],
-                                ref['table_name'],
-                                ref['field_name']
+            # Get list of databases to check, they do not depend on the reference
+            databases = self.get_database_list()
+            logger.info(f"Found {len(databases)} databases to check")
+            
+            # Get schemas within each database once for all references
+            schemas_by_db = {}
+            for database in databases:
+                schemas_by_db[database] = self.get_schemas_in_database(database)
+                logger.info(f"Found {len(schemas_by_db[database])} schemas in database {database}")
+            
+            # Get comparable data types up front, the main connection is busy with writes during the scan
+            ref_types = [(ref, self.get_comparable_data_types(ref.type_data)) for ref in sensitive_data_refs]
+            
+            # A single writer thread records results on the main connection
+            results = queue.Queue()
+            writer = threading.Thread(target=self._write_results, args=(results,))
+            writer.start()
+            try:
+                # Databases are independent, scan them in parallel on worker connections
+                with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                    futures = {}
+                    for ref, comparable_types in ref_types:
+                        logger.info(f"Queueing reference {ref.database_name}.{ref.table_name}.{ref.field_name} for {len(databases)} databases")
+                        for database in databases:
+                            future = executor.submit(
+                                self._scan_database, ref, database, schemas_by_db[database], comparable_types, results
                             )
+                            futures[future] = (ref, database)
+                    
+                    for future in as_completed(futures):
+                        ref, database = futures[future]
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Error scanning database {database} for reference {ref.database_name}.{ref.table_name}.{ref.field_name}: {str(e)}")
+                            self._failed_scans += 1
+            finally:
+                results.put(None)
+                writer.join()
+                self._close_workers()
+            
+            # Write the remaining buffered rows before reporting the outcome
+            if not self._flush_tracking():
+                self._failed_writes += 1
+            
+            if self._failed_scans or self._failed_matches or self._failed_writes:
+                logger.error(
+                    f"Sensitive data scan completed with {self._failed_scans} failed database scans, "
+                    f"{self._failed_matches} fields left unchecked and {self._failed_writes} failed tracking writes"
+                )
+                return False
             
             logger.info("Sensitive data scan completed successfully")
             return True
@@ -475,6 +716,8 @@ class SensitiveDataScanner:
             logger.error(f"Error during sensitive data scan: {str(e)}")
             return False
         finally:
+            # Write whatever is still buffered, even if the scan stopped early
+            self._flush_tracking()
             self.close()
 
 